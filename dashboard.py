@@ -1,201 +1,251 @@
+from functools import lru_cache
+
+import altair as alt
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import streamlit as st
-from babel.numbers import format_currency
 
-sns.set(style='dark')
+# Function to import and style seaborn on first use, only the matplotlib plots need it
+@lru_cache(maxsize=None)
+def load_seaborn():
+    import seaborn as sns
+    sns.set(style='dark')
+    return sns
 
 # Function to preprocess data
 def preprocess_data(df):
-    df['order_purchase_timestamp'] = pd.to_datetime(df['order_purchase_timestamp'], errors='coerce')
-    df['month'] = df['order_purchase_timestamp'].dt.to_period('M').astype(str)
+    # Month as an int32 key (months since 1970-01), formatted only when plotted
+    df['month_id'] = df['order_purchase_timestamp'].to_numpy().astype('datetime64[M]').astype('int32')
     df['total_spent'] = df['price'] + df['freight_value']
+    # Repeated ID/label columns as categoricals so groupby/value_counts work on integer codes
+    for column in ('customer_id', 'order_id', 'payment_type'):
+        df[column] = df[column].astype('category')
     return df
 
+# Columns of main_data.csv used by the dashboard, the rest are never parsed
+CSV_COLUMNS = [
+    'order_id',
+    'customer_id',
+    'order_purchase_timestamp',
+    'payment_type',
+    'review_score',
+    'price',
+    'freight_value'
+]
+
+# Number of date ranges kept per cached analysis, so the caches stay bounded
+DATE_RANGE_CACHE_ENTRIES = 16
+
+# Column types of main_data.csv, so the reader does not have to infer them
+# Money columns stay float64 so sums and RFM quintile edges keep full precision
+CSV_DTYPES = {
+    'review_score': 'int8',
+    'price': 'float64',
+    'freight_value': 'float64'
+}
+
+# Function to load and preprocess data (cached across reruns)
+@st.cache_data
+def load_data(file_path):
+    df = pd.read_csv(file_path, engine='pyarrow', usecols=CSV_COLUMNS, dtype=CSV_DTYPES, parse_dates=['order_purchase_timestamp'])
+    df = preprocess_data(df)
+    # Sort by purchase time so date ranges can be located with searchsorted
+    df = df.dropna(subset=['order_purchase_timestamp'])
+    return df.sort_values('order_purchase_timestamp', ignore_index=True)
+
+# Function to filter data by date range (not cached, the result is kept in session state)
+def filter_by_date(df, start_date, end_date):
+    timestamps = df['order_purchase_timestamp'].to_numpy(dtype='datetime64[ns]').view('i8')
+    # end_date is inclusive, so search up to midnight of the following day
+    start = pd.Timestamp(start_date).value
+    end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value
+    lo, hi = np.searchsorted(timestamps, [start, end])
+    return df.iloc[lo:hi]
+
+# Function to pre-aggregate daily sales once, monthly totals are rolled up from these rows
+@st.cache_data
+def load_daily_sales(file_path):
+    df = load_data(file_path)
+    purchase_date = df['order_purchase_timestamp'].dt.normalize()
+    return df.groupby(purchase_date).agg(month_id=('month_id', 'first'), total_sales=('price', 'sum'))
+
+# Function to get monthly sales within a date range
+def get_monthly_sales(daily_sales, start_date, end_date):
+    daily_sales = daily_sales.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+    monthly_sales = daily_sales.groupby('month_id').agg(total_sales=('total_sales', 'sum')).reset_index()
+    monthly_sales.insert(0, 'month', monthly_sales.pop('month_id').to_numpy().astype('datetime64[M]').astype(str))
+    return monthly_sales
+
 # Function to plot monthly sales
-def plot_monthly_sales(df):
-    monthly_sales = df.groupby('month').agg(total_sales=('price', 'sum')).reset_index()
-    plt.figure(figsize=(10, 6))
-    sns.lineplot(x='month', y='total_sales', data=monthly_sales, marker='o', color='Blue', linewidth=2.5, markersize=8)
-    plt.title('Total Penjualan Per Bulan', fontsize=16)
-    plt.xlabel('Bulan', fontsize=12)
-    plt.ylabel('Total Penjualan (R$)', fontsize=12)
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    return plt
+def plot_monthly_sales(daily_sales, start_date, end_date):
+    monthly_sales = get_monthly_sales(daily_sales, start_date, end_date)
+    chart = alt.Chart(monthly_sales, title='Total Penjualan Per Bulan').mark_line(
+        point=alt.OverlayMarkDef(size=80), color='blue', strokeWidth=2.5
+    ).encode(
+        x=alt.X('month:O', title='Bulan', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('total_sales:Q', title='Total Penjualan (R$)'),
+        tooltip=['month', alt.Tooltip('total_sales:Q', format=',.2f')]
+    )
+    return chart
 
 # Function to plot rating distribution
 def plot_rating_distribution(df):
-    rating_counts = df['review_score'].value_counts().sort_index()
-    plt.figure(figsize=(8, 6))
-    sns.barplot(x=rating_counts.index, y=rating_counts.values, palette='coolwarm')
-    plt.title('Distribusi Rating Ulasan Pelanggan', fontsize=16)
-    plt.xlabel('Rating', fontsize=12)
-    plt.ylabel('Jumlah Ulasan', fontsize=12)
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    return plt
+    # Ratings are 1-5, so count them by direct indexing instead of hashing
+    counts = np.bincount(df['review_score'].to_numpy(), minlength=6)[1:6]
+    rating_counts = pd.DataFrame({'review_score': np.arange(1, 6), 'count': counts})
+    chart = alt.Chart(rating_counts, title='Distribusi Rating Ulasan Pelanggan').mark_bar().encode(
+        x=alt.X('review_score:O', title='Rating', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('count:Q', title='Jumlah Ulasan'),
+        color=alt.Color('review_score:O', scale=alt.Scale(scheme='redblue', reverse=True), legend=None),
+        tooltip=['review_score', 'count']
+    )
+    return chart
 
 # Function to plot payment methods
 def plot_payment_methods(df):
-    payment_counts = df['payment_type'].value_counts()
-    plt.figure(figsize=(8, 8))
-    plt.pie(payment_counts, labels=payment_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Set3"))
-    plt.title('Metode Pembayaran yang Paling Sering Digunakan', fontsize=16)
-    plt.tight_layout()
-    return plt
+    payment_type = df['payment_type'].cat
+    codes = payment_type.codes.to_numpy()
+    # Missing payment types have code -1, skip them like value_counts does
+    counts = np.bincount(codes[codes >= 0], minlength=len(payment_type.categories))
+    payment_counts = pd.Series(counts, index=payment_type.categories).sort_values(ascending=False)
+    payment_counts = payment_counts[payment_counts > 0]
+    sns = load_seaborn()
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.pie(payment_counts, labels=payment_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Set3"))
+    ax.set_title('Metode Pembayaran yang Paling Sering Digunakan', fontsize=16)
+    fig.tight_layout()
+    return fig
 
 # Function to get top customers
 def get_top_customers(df, n=10):
-    top_customers = df.groupby('customer_id').agg(total_spent=('price', 'sum')).reset_index()
-    top_customers = top_customers.sort_values(by='total_spent', ascending=False).head(n)
-    return top_customers
+    top_customers = df.groupby('customer_id', observed=True, sort=False)['price'].sum().nlargest(n)
+    return top_customers.reset_index(name='total_spent')
 
 # Function to plot top customers
 def plot_top_customers(df, n=10):
     top_customers = get_top_customers(df, n)
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x='total_spent', y='customer_id', data=top_customers, palette='rocket', edgecolor='black', alpha=0.8, orient='h')
-    plt.title('Top 10 Pelanggan Terbaik', fontsize=16)
-    plt.xlabel('Total Pengeluaran (R$)', fontsize=12)
-    plt.ylabel('ID Pelanggan', fontsize=12)
-    plt.grid(axis='x', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    return plt
+    sns = load_seaborn()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.barplot(x='total_spent', y='customer_id', data=top_customers.astype({'customer_id': str}), palette='rocket', edgecolor='black', alpha=0.8, orient='h', ax=ax)
+    ax.set_title('Top 10 Pelanggan Terbaik', fontsize=16)
+    ax.set_xlabel('Total Pengeluaran (R$)', fontsize=12)
+    ax.set_ylabel('ID Pelanggan', fontsize=12)
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    return fig
 
 # Function to get top positive reviewers
 def get_top_positive_reviewers(df, n=10):
-    positive_reviews = df[df['review_score'] >= 4]
-    positive_reviews_by_customer = positive_reviews.groupby('customer_id').size().reset_index(name='positive_reviews_count')
-    top_positive_customers = positive_reviews_by_customer.sort_values(by='positive_reviews_count', ascending=False).head(n)
-    return top_positive_customers
+    positive_reviews = df.loc[df['review_score'] >= 4, 'customer_id'].value_counts(sort=False)
+    top_positive_customers = positive_reviews.nlargest(n)
+    # Categorical value_counts also lists customers without positive reviews
+    top_positive_customers = top_positive_customers[top_positive_customers > 0]
+    return top_positive_customers.rename_axis('customer_id').reset_index(name='positive_reviews_count')
 
 # Function to plot top positive reviewers
 def plot_top_positive_reviewers(df, n=10):
     top_positive_customers = get_top_positive_reviewers(df, n)
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x='positive_reviews_count', y='customer_id', data=top_positive_customers, palette='rocket', edgecolor='black', alpha=0.8, orient='h')
-    plt.title('Karakteristik Pelanggan dengan Ulasan Positif', fontsize=16)
-    plt.xlabel('Jumlah Ulasan Positif', fontsize=12)
-    plt.ylabel('ID Pelanggan', fontsize=12)
-    plt.grid(axis='x', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    return plt
+    sns = load_seaborn()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.barplot(x='positive_reviews_count', y='customer_id', data=top_positive_customers.astype({'customer_id': str}), palette='rocket', edgecolor='black', alpha=0.8, orient='h', ax=ax)
+    ax.set_title('Karakteristik Pelanggan dengan Ulasan Positif', fontsize=16)
+    ax.set_xlabel('Jumlah Ulasan Positif', fontsize=12)
+    ax.set_ylabel('ID Pelanggan', fontsize=12)
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    return fig
 
-# Function to plot correlation matrix
-def plot_correlation_matrix(df):
+# Function to calculate correlation matrix (cache keyed on the date range of the filtered df)
+@st.cache_data(max_entries=DATE_RANGE_CACHE_ENTRIES)
+def get_correlation_matrix(_df, start_date, end_date):
+    df = _df
     # Select only numeric columns
     numeric_df = df.select_dtypes(include=['number'])
-    # Drop ID-like columns
-    columns_to_exclude = ['customer_id', 'order_id', 'product_id']
+    # Drop ID-like and key columns
+    columns_to_exclude = ['customer_id', 'order_id', 'product_id', 'month_id']
     numeric_df = numeric_df.drop(columns=columns_to_exclude, errors='ignore')
     # Calculate correlation matrix
-    correlation_matrix = numeric_df.corr()
+    return numeric_df.corr()
+
+# Function to plot correlation matrix
+def plot_correlation_matrix(correlation_matrix):
     # Plot heatmap
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(
-        correlation_matrix, 
-        annot=True, 
-        cmap='viridis', 
-        fmt='.2f', 
-        linewidths=0.5, 
-        linecolor='gray', 
-        cbar_kws={"shrink": .8},
-        annot_kws={"fontsize": 10, "color": "black"}
+    columns = list(correlation_matrix.columns)
+    correlation_df = correlation_matrix.stack().rename_axis(['x', 'y']).reset_index(name='correlation')
+    base = alt.Chart(correlation_df, title='Correlation Matrix (Excluding IDs)').encode(
+        x=alt.X('x:N', title=None, sort=columns, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('y:N', title=None, sort=columns)
     )
-    plt.title('Correlation Matrix (Excluding IDs)', fontsize=18, fontweight='bold', pad=20)
-    plt.xticks(fontsize=12, rotation=45)
-    plt.yticks(fontsize=12, rotation=0)
-    plt.tight_layout()
-    return plt
-
-# Function to perform RFM Analysis
-def perform_rfm_analysis(df):
-    # Recency
-    latest_date = df['order_purchase_timestamp'].max()
-    recency_df = df.groupby('customer_id').agg({
-        'order_purchase_timestamp': lambda x: (latest_date - x.max()).days
-    }).reset_index()
-    recency_df.rename(columns={'order_purchase_timestamp': 'Recency'}, inplace=True)
-    
-    # Frequency
-    frequency_df = df.groupby('customer_id').agg({
-        'order_id': 'nunique'  # Jumlah pesanan unik
-    }).reset_index()
-    frequency_df.rename(columns={'order_id': 'Frequency'}, inplace=True)
-    
-    # Monetary
-    monetary_df = df.groupby('customer_id').agg({
-        'total_spent': 'sum'
-    }).reset_index()
-    monetary_df.rename(columns={'total_spent': 'Monetary'}, inplace=True)
-    
-    # Merge RFM dataframes
-    rfm_df = pd.merge(recency_df, frequency_df, on='customer_id')
-    rfm_df = pd.merge(rfm_df, monetary_df, on='customer_id')
+    heatmap = base.mark_rect(stroke='gray', strokeWidth=0.5).encode(
+        color=alt.Color('correlation:Q', scale=alt.Scale(scheme='viridis'))
+    )
+    text = base.mark_text(fontSize=10, color='black').encode(
+        text=alt.Text('correlation:Q', format='.2f')
+    )
+    return (heatmap + text).properties(height=500)
+
+# RFM scoring parameters
+RFM_QUINTILES = [0.2, 0.4, 0.6, 0.8]
+FREQUENCY_BIN_EDGES = [1, 2, 3, 4]
+SEGMENT_THRESHOLDS = [3, 6, 9, 12]
+SEGMENT_LABELS = ['Lost Customers', 'At Risk', 'Potential Loyalists', 'Loyal Customers', 'Champions']
+
+# Function to score Recency, Frequency and Monetary arrays on a 1-5 scale
+def score_rfm(recency, frequency, monetary):
+    # Same right-closed quintile bins as pd.qcut: searchsorted counts the edges below each value
+    r_score = 5 - np.searchsorted(np.quantile(recency, RFM_QUINTILES), recency)
+    f_score = 1 + np.searchsorted(FREQUENCY_BIN_EDGES, frequency)
+    m_score = 1 + np.searchsorted(np.quantile(monetary, RFM_QUINTILES), monetary)
+    return r_score, f_score, m_score
+
+# Function to perform RFM Analysis (cache keyed on the date range of the filtered df)
+@st.cache_data(max_entries=DATE_RANGE_CACHE_ENTRIES)
+def perform_rfm_analysis(_df, start_date, end_date):
+    df = _df
+    # Recency, Frequency and Monetary in a single aggregation
+    rfm_df = df.groupby('customer_id', observed=True, sort=False).agg(
+        last_purchase=('order_purchase_timestamp', 'max'),
+        Frequency=('order_id', 'nunique'),  # Jumlah pesanan unik
+        Monetary=('total_spent', 'sum')
+    ).reset_index()
+    # Latest date is the max of the per-customer maxima, no second scan over df
+    last_purchase = rfm_df.pop('last_purchase')
+    rfm_df.insert(1, 'Recency', (last_purchase.max() - last_purchase).dt.days)
     
     # Score RFM
-    rfm_df['R_Score'] = pd.qcut(rfm_df['Recency'], q=5, labels=[5, 4, 3, 2, 1], duplicates='drop')
-    
-    # Frequency with custom bins
-    bins = [0, 1, 2, 3, 4, float('inf')]
-    labels = [1, 2, 3, 4, 5]
-    rfm_df['F_Score'] = pd.cut(rfm_df['Frequency'], bins=bins, labels=labels)
-    
-    rfm_df['M_Score'] = pd.qcut(rfm_df['Monetary'], q=5, labels=[1, 2, 3, 4, 5], duplicates='drop')
+    rfm_df['R_Score'], rfm_df['F_Score'], rfm_df['M_Score'] = score_rfm(
+        rfm_df['Recency'].to_numpy(), rfm_df['Frequency'].to_numpy(), rfm_df['Monetary'].to_numpy()
+    )
     
     # Total RFM Score
-    rfm_df['RFM_Score'] = rfm_df['R_Score'].astype(int) + rfm_df['F_Score'].astype(int) + rfm_df['M_Score'].astype(int)
+    rfm_df['RFM_Score'] = rfm_df['R_Score'] + rfm_df['F_Score'] + rfm_df['M_Score']
     
     # Segment Customers
-    def segment_customer(row):
-        if row['RFM_Score'] >= 12:
-            return 'Champions'
-        elif 9 <= row['RFM_Score'] < 12:
-            return 'Loyal Customers'
-        elif 6 <= row['RFM_Score'] < 9:
-            return 'Potential Loyalists'
-        elif 3 <= row['RFM_Score'] < 6:
-            return 'At Risk'
-        else:
-            return 'Lost Customers'
-    
-    rfm_df['Segment'] = rfm_df.apply(segment_customer, axis=1)
+    segment_codes = np.searchsorted(SEGMENT_THRESHOLDS, rfm_df['RFM_Score'].to_numpy(), side='right')
+    rfm_df['Segment'] = pd.Categorical.from_codes(segment_codes, categories=SEGMENT_LABELS)
     
     return rfm_df
 
 # Function to plot customer segments
 def plot_customer_segments(rfm_df):
-    plt.figure(figsize=(10, 6))
-    ax = sns.countplot(data=rfm_df, x='Segment', palette='coolwarm', order=rfm_df['Segment'].value_counts().index)
+    segment_counts = rfm_df['Segment'].value_counts()
+    segment_counts = segment_counts[segment_counts > 0].rename_axis('Segment').reset_index(name='count')
+    segment_counts['Segment'] = segment_counts['Segment'].astype(str)
+    bars = alt.Chart(segment_counts).mark_bar().encode(
+        x=alt.X('Segment:N', title='Segment', sort='-y', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('count:Q', title='Jumlah Pelanggan'),
+        color=alt.Color('Segment:N', scale=alt.Scale(scheme='redblue', reverse=True), legend=None)
+    )
     
     # Annotate bars
-    for bar in ax.patches:
-        height = bar.get_height()
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height + 50,
-            f'{int(height)}',
-            ha='center',
-            fontsize=10,
-            color='black'
-        )
+    labels = bars.mark_text(dy=-8, fontSize=10).encode(text='count:Q', color=alt.value('black'))
     
-    plt.title('Distribusi Segmen Pelanggan Berdasarkan RFM', fontsize=16)
-    plt.xlabel('Segment', fontsize=12)
-    plt.ylabel('Jumlah Pelanggan', fontsize=12)
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    return plt
+    return (bars + labels).properties(title='Distribusi Segmen Pelanggan Berdasarkan RFM')
 
 # Load and preprocess data
 file_path = 'main_data.csv'
-df = pd.read_csv(file_path)
-df = preprocess_data(df)
+df = load_data(file_path)
 
 # Menentukan rentang tanggal minimum dan maksimum
 min_date = df['order_purchase_timestamp'].min().date()
@@ -206,7 +256,12 @@ st.sidebar.header("Filter Tanggal")
 start_date, end_date = st.sidebar.date_input("Pilih Rentang Tanggal", [min_date, max_date])
 
 # Mengfilter data berdasarkan rentang tanggal
-filtered_df = df[(df['order_purchase_timestamp'].dt.date >= start_date) & (df['order_purchase_timestamp'].dt.date <= end_date)]
+# Kept in session state so changing only the visualization reuses the same frame
+filter_key = (start_date, end_date)
+if st.session_state.get('filter_key') != filter_key:
+    st.session_state['filtered_df'] = filter_by_date(df, start_date, end_date)
+    st.session_state['filter_key'] = filter_key
+filtered_df = st.session_state['filtered_df']
 
 # Title of the dashboard
 st.title("Olist Marketplace Analysis Dashboard")
@@ -229,39 +284,43 @@ option = st.sidebar.selectbox(
 # Display visualizations based on selection
 if option == "Penjualan Bulanan":
     st.header("Total Penjualan Per Bulan")
-    fig = plot_monthly_sales(filtered_df)
-    st.pyplot(fig)
+    chart = plot_monthly_sales(load_daily_sales(file_path), start_date, end_date)
+    st.altair_chart(chart, use_container_width=True)
 
 elif option == "Distribusi Rating":
     st.header("Distribusi Rating Ulasan Pelanggan")
-    fig = plot_rating_distribution(filtered_df)
-    st.pyplot(fig)
+    chart = plot_rating_distribution(filtered_df)
+    st.altair_chart(chart, use_container_width=True)
 
 elif option == "Metode Pembayaran":
     st.header("Metode Pembayaran yang Paling Sering Digunakan")
     fig = plot_payment_methods(filtered_df)
     st.pyplot(fig)
+    plt.close(fig)
 
 elif option == "Pelanggan Terbaik":
     st.header("Top 10 Pelanggan Terbaik")
     fig = plot_top_customers(filtered_df)
     st.pyplot(fig)
+    plt.close(fig)
 
 elif option == "Ulasan Positif":
     st.header("Karakteristik Pelanggan dengan Ulasan Positif")
     fig = plot_top_positive_reviewers(filtered_df)
     st.pyplot(fig)
+    plt.close(fig)
 
 elif option == "Korelasi":
     st.header("Matriks Korelasi")
-    fig = plot_correlation_matrix(filtered_df)
-    st.pyplot(fig)
+    correlation_matrix = get_correlation_matrix(filtered_df, start_date, end_date)
+    chart = plot_correlation_matrix(correlation_matrix)
+    st.altair_chart(chart, use_container_width=True)
 
 elif option == "Segmentasi RFM":
     st.header("Segmentasi Pelanggan Berdasarkan RFM")
-    rfm_df = perform_rfm_analysis(filtered_df)
-    fig = plot_customer_segments(rfm_df)
-    st.pyplot(fig)
+    rfm_df = perform_rfm_analysis(filtered_df, start_date, end_date)
+    chart = plot_customer_segments(rfm_df)
+    st.altair_chart(chart, use_container_width=True)
     
     # Show RFM DataFrame
     st.subheader("RFM Segmentation Details")